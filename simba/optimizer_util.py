@@ -1,4 +1,5 @@
 """ Module for LowSocEvent, ChargingEvent, OptimizerConfig and utility functionality """
+import itertools
 import logging
 import math
 import os
@@ -13,7 +14,6 @@ from copy import copy
 from datetime import timedelta, datetime
 from time import time
 import numpy as np
-from matplotlib import pyplot as plt
 
 if typing.TYPE_CHECKING:
     from simba.station_optimizer import StationOptimizer
@@ -279,6 +279,37 @@ def get_index_by_time(scenario, search_time):
     return (search_time - scenario.start_time) // scenario.interval
 
 
+def fast_deepcopy(obj):
+    """ Duplicate an object by round-tripping it through pickle.
+
+    For large object graphs like a scenario, serializing with the C pickle implementation
+    is considerably faster than copy.deepcopy, which recurses through the graph in Python.
+
+    :param obj: object to be duplicated. Must be picklable, like the scenario and
+        schedule objects, which are also dumped to disk via pickle.
+    :return: independent copy of the object
+    """
+    return pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def copy_vehicle_socs(vehicle_socs: dict):
+    """ Create an independent copy of SoC data for all vehicles.
+
+    The SoC time series are copied as contiguous numpy arrays, i.e. a single bulk
+    allocation per vehicle, which is considerably faster than a recursive deepcopy
+    of nested python lists. Single precision is used, since SoCs are bounded values
+    and the optimizer thresholds are nowhere near float32 resolution, while copies
+    and comparisons only move half the bytes.
+
+    :param vehicle_socs: SoC time series per vehicle id
+    :type vehicle_socs: dict
+    :return: copied SoC data with numpy arrays as values
+    :rtype: dict
+    """
+    return {vehicle_id: np.array(soc, dtype=np.float32)
+            for vehicle_id, soc in vehicle_socs.items()}
+
+
 def get_rotation_soc(rot_id, schedule, scenario, soc_data: dict = None):
     """ Return the SoC time series with start and end index for a given rotation ID.
 
@@ -348,7 +379,10 @@ def get_delta_soc(soc_over_time_curve, soc, duration_min: float):
         # this makes sure the battery is actually at 100%
         start_soc = soc
     else:
-        end_soc = soc_over_time_curve[soc_over_time_curve[:, 0] >= second_time][0, 1]
+        # the time column is monotonically rising, so the first entry at or after second_time
+        # can be found by bisection instead of a full boolean scan
+        end_soc = soc_over_time_curve[np.searchsorted(
+            soc_over_time_curve[:, 0], second_time, side='left'), 1]
 
     return end_soc - start_soc + negative_soc
 
@@ -387,19 +421,43 @@ def evaluate(events: typing.Iterable[LowSocEvent],
     soc_upper_thresh = kwargs.get("soc_upper_thresh", optimizer.args.desired_soc_deps)
     soc_data = kwargs.get("soc_data", optimizer.scenario.vehicle_socs)
 
+    # hoist invariant lookups out of the per-trip loop below
+    start_time = optimizer.scenario.start_time
+    interval = optimizer.scenario.interval
+    args = optimizer.args
+    desired_soc = args.desired_soc_opps
+    max_soc_delta = soc_upper_thresh - soc_lower_thresh
+
     station_eval = {}
     # Note: Lift describes the positive delta in the soc time series through electrification.
     # cycle through events and determine how much lift can be provided by electrifying a station
     # the lift is determined by the soc position, standing time, power supply and charging curve
     for e in events:
         soc_over_time = optimizer.soc_charge_curve_dict[e.v_type][e.ch_type]
-        for i, trip in enumerate(e.trip):
-            # station is only evaluated if station name is part of event stations
-            # only these stations showed potential in electrification, e.g. enough standing time
-            if trip.arrival_name not in e.stations:
-                continue
-            idx = get_index_by_time(optimizer.scenario, trip.arrival_time, )
-            soc = soc_data[e.vehicle_id][idx]
+        vehicle_soc = soc_data[e.vehicle_id]
+        try:
+            eval_trips = e.eval_trips
+        except AttributeError:
+            # the trips of an event, their timeseries indices and standing times do not change
+            # between evaluations, only the SoC data does. Gather them once per event and cache
+            # the result on the event itself
+            eval_trips = []
+            for i, trip in enumerate(e.trip):
+                # station is only evaluated if station name is part of event stations
+                # only these stations showed potential in electrification,
+                # e.g. enough standing time
+                if trip.arrival_name not in e.stations:
+                    continue
+                idx = (trip.arrival_time - start_time) // interval
+                try:
+                    standing_time_min = get_charging_time(trip, e.trip[i + 1], args)
+                except IndexError:
+                    standing_time_min = 0
+                eval_trips.append((trip.arrival_name, idx, standing_time_min))
+            e.eval_trips = eval_trips
+
+        for arrival_name, idx, standing_time_min in eval_trips:
+            soc = vehicle_soc[idx]
 
             # potential is the minimal amount of the following boundaries
             # - soc can only be lifted to the upper threshold
@@ -412,14 +470,8 @@ def evaluate(events: typing.Iterable[LowSocEvent],
                 soc_upper_thresh - soc,
                 soc_lower_thresh - e.min_soc,
                 soc - e.min_soc,
-                soc_upper_thresh - soc_lower_thresh)
-
-            try:
-                standing_time_min = get_charging_time(trip, e.trip[i + 1], optimizer.args)
-            except IndexError:
-                standing_time_min = 0
+                max_soc_delta)
 
-            desired_soc = optimizer.args.desired_soc_opps
             soc = max(soc, 0)
             d_soc = get_delta_soc(soc_over_time, soc, standing_time_min)
             pot_kwh = min(d_soc, desired_soc) * e.capacity
@@ -427,10 +479,7 @@ def evaluate(events: typing.Iterable[LowSocEvent],
             # potential is at max the minimum between the useful delta soc * capacity or the
             # energy provided by charging for the full standing time
             delta_e_pot = min(delta_soc_pot * e.capacity, pot_kwh)
-            try:
-                station_eval[trip.arrival_name] += delta_e_pot
-            except KeyError:
-                station_eval[trip.arrival_name] = delta_e_pot
+            station_eval[arrival_name] = station_eval.get(arrival_name, 0) + delta_e_pot
 
     # sort by pot_sum
     station_eval_list = sorted(station_eval.items(), key=lambda x: x[1], reverse=True)
@@ -472,23 +521,29 @@ def get_groups_from_events(events, impossible_stations=None, could_not_be_electr
     station_subsets = join_all_subsets(possible_stations)
     event_groups = [[] for __ in range(len(station_subsets))]
 
+    # inverted index from station to the subset it belongs to. The subsets are disjoint,
+    # so every station maps to exactly one subset
+    station_to_subset = {}
+    for i, subset in enumerate(station_subsets):
+        for station in subset:
+            station_to_subset[station] = i
+
     # group the events in the same manner as stations, so that the same amount of event groups are
     # created as station subsets
     for event in events:
-        for i, subset in enumerate(station_subsets):
-            # every station from an event must share the same station subset. Therefore its enough
-            # to check only the first element
-            if len(event.stations) > 0:
-                if next(iter(event.stations)) in subset:
-                    event_groups[i].append(event)
-                    break
-        else:
-            if optimizer:
-                optimizer.logger.warning(f"Rotation {event.rotation.id} has no possible "
-                                         "electrifiable stations and will be removed.")
-                # this event will not show up in an event_group.
-                # therefore it needs to be put into this set
-            could_not_be_electrified.update([event.rotation.id])
+        # every station from an event must share the same station subset. Therefore its enough
+        # to check only the first element
+        if len(event.stations) > 0:
+            subset_index = station_to_subset.get(next(iter(event.stations)))
+            if subset_index is not None:
+                event_groups[subset_index].append(event)
+                continue
+        if optimizer:
+            optimizer.logger.warning(f"Rotation {event.rotation.id} has no possible "
+                                     "electrifiable stations and will be removed.")
+            # this event will not show up in an event_group.
+            # therefore it needs to be put into this set
+        could_not_be_electrified.update([event.rotation.id])
 
     groups = list(zip(event_groups, station_subsets))
     # each event group should have events and stations. If not, something went wrong.
@@ -509,73 +564,51 @@ def join_all_subsets(subsets):
     :rtype: list(set)
     """
 
-    # create set of all stations in given subsets
-    all_stations = {station for subset in subsets for station in subset}
-    # make list from station set to have fixed order
-    all_stations_list = list(all_stations)
-
-    # create look-up-table from station name to index in all_stations_list
-    all_stations_index = dict()
-    for i, station in enumerate(all_stations_list):
-        all_stations_index[station] = i
-
-    # station_array: boolean matrix of dimension n*m with n being the number of unique stations and
-    # m the amount of subsets. If a station is part of the subset it will be set to True
-    # this will turn the subsets
-    # Sub_s_0={Station4}
-    # Sub_s_1={Station0}
-    # Sub_s_2={Station1}
-    # Sub_s_3={Station0,Station2}
-    # Sub_s_4={Station3}
-    # into
-    #          Sub_s_0  Sub_s_1  Sub_s_2  Sub_s_3  Sub_s_4
-    # Station0 False    True     False    True     False
-    # Station1 False    False    True     False    False
-    # Station2 False    False    False    True     False
-    # Station3 False    False    False    False    True
-    # Station4 True     False    False    False    False
-    station_array = np.zeros((len(all_stations), len(subsets))).astype(bool)
-    for i, subset in enumerate(subsets):
-        for station in subset:
-            station_array[all_stations_index[station], i] = True
-
-    # Traverse the matrix row wise station by station.
-    # Columns which share a True value in this row are merged to a single one.
-    # All rows (!) of these columns  are merged into a new subset.
-    # This translates to subsets sharing the same station.
-
-    # The result cannot contain any overlapping columns / sets
-    #          Sub_s_0  Sub_s_1  Sub_s_2  Sub_s_3  Sub_s_4
-    # Station0 False    True     False    True     False
-
-    # returns the indicies 1 and 3. the columns are merged.
-    #          Sub_s_0  Sub_s_1/Sub_s_3  Sub_s_2  Sub_s_4
-    # Station0 False    True             False    False
-    # Station1 False    False            True     False
-    # Station2 False    True             False     False
-    # Station3 False    False            False     True
-    # Station4 True     False            False    False
-
-    # The other rows are compared as well but share no True values and are not changed.
-    # Afterwards, all rows contain only a single True value. These are the final merged subsets.
-    # In the example, Sub_s_0 contains Station4, Sub_s_1/3 contains Station0 and Station2 and so on.
-    rows = station_array.shape[0]
-    for row in range(rows):
-        indicies = np.where(station_array[row, :])[0]
-        if len(indicies) > 1:
-            station_array[:, indicies[0]] = np.sum(station_array[:, indicies], axis=1).astype(bool)
-            station_array = np.delete(station_array, indicies[1:], axis=1)
-
-    # Translate the matrix back to subsets
-    columns = station_array.shape[1]
-    subsets = []
-    for column in range(columns):
-        subset = set()
-        indicies = np.where(station_array[:, column])[0]
-        for ind in indicies:
-            subset.add(all_stations_list[ind])
-        subsets.append(subset)
-    return subsets
+    # Disjoint-set union over the stations: subsets sharing a station end up with the same
+    # root. parent maps every station to a representative; following the chain leads to the root
+    parent = {}
+
+    def find(station):
+        # find the root and compress the path along the way
+        root = station
+        while parent[root] != root:
+            root = parent[root]
+        while parent[station] != root:
+            parent[station], station = root, parent[station]
+        return root
+
+    for subset in subsets:
+        subset_iter = iter(subset)
+        first = next(subset_iter, None)
+        if first is None:
+            # empty subsets have no stations to join but stay part of the result
+            continue
+        parent.setdefault(first, first)
+        anchor = find(first)
+        for station in subset_iter:
+            parent.setdefault(station, station)
+            root = find(station)
+            if root != anchor:
+                parent[root] = anchor
+
+    # bucket all stations by their root to get the merged groups
+    buckets = {}
+    for station in parent:
+        buckets.setdefault(find(station), set()).add(station)
+
+    # return the groups in the order of the first subset which contributed to them.
+    # Empty input subsets are kept, as before
+    joined_subsets = []
+    seen_roots = set()
+    for subset in subsets:
+        if not subset:
+            joined_subsets.append(set())
+            continue
+        root = find(next(iter(subset)))
+        if root not in seen_roots:
+            seen_roots.add(root)
+            joined_subsets.append(buckets[root])
+    return joined_subsets
 
 
 def toolbox_from_pickle(sched_name, scen_name, args_name):
@@ -626,9 +659,14 @@ def toolbox_to_pickle(name, sched, scen, args):
 
 def charging_curve_to_soc_over_time(
         charging_curve, capacity, final_value: float, max_charge_from_grid=float('inf'),
-        time_step=0.1, efficiency=1, eps=0.001, logger: logging.Logger = None):
+        time_step=0.1, efficiency=1, eps=0.001, logger: logging.Logger = None,
+        _cache={}):
     """ Create charging curve as np.array with soc and time as two columns of an np.array.
 
+    Results are memoized on the numeric input values, since the numeric simulation of the
+    curve is expensive and the same few vehicle type / charging type combinations are
+    requested over and over during optimization.
+
     :param logger: logger
     :type logger: logging.Logger
     :param eps: smallest normalized power, where charging curve will stop
@@ -645,9 +683,17 @@ def charging_curve_to_soc_over_time(
     :type time_step: float
     :param efficiency: efficiency of charging
     :type efficiency: float
+    :param _cache: memoization storage, maps input values to previously created curves
+    :type _cache: dict
     :return: soc and time with n values each
     :rtype: np.array of shape (n, 2)
     """
+    key = (tuple(tuple(point) for point in charging_curve), capacity, final_value,
+           max_charge_from_grid, time_step, efficiency, eps)
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
     # simple numeric creation of power over time --> to energy over time
     normalized_curve = np.array([[soc, power / capacity] for soc, power in charging_curve])
     soc = 0
@@ -655,26 +701,27 @@ def charging_curve_to_soc_over_time(
     socs = []
     times = []
 
-    starting_power = min(
-        np.interp(soc, normalized_curve[:, 0], normalized_curve[:, 1]),
-        max_charge_from_grid / capacity)
+    # hoist values which do not change during the numeric simulation out of the loop
+    curve_socs = np.ascontiguousarray(normalized_curve[:, 0])
+    curve_powers = np.ascontiguousarray(normalized_curve[:, 1])
+    grid_power = max_charge_from_grid / capacity
+    time_step_h = time_step / 60
+
+    starting_power = min(np.interp(soc, curve_socs, curve_powers), grid_power)
     if starting_power <= 0:
         times.append(charge_time)
         socs.append(soc)
-        return np.array((times, socs)).T
+        _cache[key] = np.array((times, socs)).T
+        return _cache[key]
 
     while soc < final_value:
         times.append(charge_time)
         socs.append(soc)
-        power1 = min(
-            np.interp(soc, normalized_curve[:, 0], normalized_curve[:, 1]),
-            max_charge_from_grid / capacity)
-        soc2 = soc + time_step / 60 * power1
-        power2 = min(
-            np.interp(soc2, normalized_curve[:, 0], normalized_curve[:, 1]),
-            max_charge_from_grid / capacity)
+        power1 = min(np.interp(soc, curve_socs, curve_powers), grid_power)
+        soc2 = soc + time_step_h * power1
+        power2 = min(np.interp(soc2, curve_socs, curve_powers), grid_power)
         power = (power1 + power2) / 2 * efficiency
-        delta_soc = time_step / 60 * power
+        delta_soc = time_step_h * power
         soc += delta_soc
         charge_time += time_step
         if power/starting_power < eps:
@@ -689,7 +736,8 @@ def charging_curve_to_soc_over_time(
     # fill the soc completely in last time step
     times.append(charge_time)
     socs.append(final_value)
-    return np.array((times, socs)).T
+    _cache[key] = np.array((times, socs)).T
+    return _cache[key]
 
 
 def get_missing_energy(events, min_soc=0):
@@ -702,23 +750,36 @@ def get_missing_energy(events, min_soc=0):
     :return: missing energy
     :rtype: float
     """
-    missing_energy = 0
-    for event in events:
-        # events should be by definition below the min_soc defined by the config
-        assert event.min_soc < min_soc
-        missing_energy += (event.min_soc-min_soc) * event.capacity
-    return missing_energy
+    # pull the two needed fields into parallel float arrays, so the sum is computed
+    # vectorized instead of in a Python loop. This function is called from every recursion
+    # of the group optimization, making it a hot path.
+    min_socs = np.fromiter((event.min_soc for event in events), dtype=np.float64)
+    capacities = np.fromiter((event.capacity for event in events), dtype=np.float64)
+    # events should be by definition below the min_soc defined by the config
+    assert (min_socs < min_soc).all()
+    return float(((min_socs - min_soc) * capacities).sum())
 
 
-def stations_hash(stations_set):
+def stations_hash(stations_set, _cache={}):
     """ Create a simple string as hash for a set of stations.
 
+    The same station sets are hashed over and over while traversing the decision tree,
+    so the sorted string representation is memoized per frozenset. The string format is
+    kept, since it is human-readable and part of pickled decision trees.
+
     :param stations_set: stations to be hashed
     :type stations_set: set
+    :param _cache: memoization storage, maps station sets to previously created hashes
+    :type _cache: dict
     :return: hash
     :rtype: str
     """
-    return str(sorted(stations_set))
+    key = frozenset(stations_set)
+    try:
+        return _cache[key]
+    except KeyError:
+        _cache[key] = str(sorted(stations_set))
+        return _cache[key]
 
 
 def recursive_dict_updater(dict_to_change, filter_function, modify_function):
@@ -760,21 +821,12 @@ def combination_generator(iterable: typing.Iterable, amount: int):
     :rtype iterable: iterable
     :param amount: Number of elements which should be drawn from iterable
     :type amount: int
-    :yields: list of items
+    :yields: tuple of items
 
     """
-    iterable = list(iterable)
-
-    for i, item in enumerate(iterable):
-        # recursive calling of generator with clock like behavior, e.g right-most item changes until
-        # end of list is reached. This leads to a change in the item left to it and so on. Elements
-        # on the right can only change to a subset of bigger indices than their left counter-part.
-        # this is due to the ignoring of order, which reduces the amount of possibilities.
-        if amount <= 1:
-            yield [item]
-        else:
-            for gen in combination_generator(iterable[i + 1:], amount - 1):
-                yield [item] + gen
+    # itertools.combinations yields the elements in the same lexicographic order as the previous
+    # recursive implementation, but without building intermediate lists on every step.
+    yield from itertools.combinations(iterable, amount)
 
 
 def combs_unordered_no_putting_back(n: int, k: int):
@@ -853,6 +905,8 @@ def plot_(data, axis=None):
     :param axis: axis to be plotted to. Default None will create new figure and axis
     :type axis: matplotlib.axes.Axes
     :return: axis of the plot """
+    # import on demand: matplotlib is only needed for the interactive plotting helpers
+    from matplotlib import pyplot as plt
     if axis is None:
         fig, axis = plt.subplots()
     try:
@@ -887,6 +941,7 @@ def plot_rot(rot_id, sched, scen, axis=None, rot_only=True):
     :return: axis of the plot
     :rtype: matplotlib.axes
     """
+    from matplotlib import pyplot as plt
     soc, start, end = get_rotation_soc(rot_id, sched, scen)
     if not rot_only:
         start = 0
@@ -10,6 +10,7 @@ import matplotlib.colors
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.patches import Patch
+import numpy as np
 from spice_ev.report import aggregate_global_results, plot, generate_reports, aggregate_timeseries
 from spice_ev.util import sanitize
 
@@ -17,6 +18,22 @@ from simba import util
 
 DPI = 300
 
+ROTATION_SUMMARY_COLUMNS = (
+    "rotation_id",
+    "start_time",
+    "end_time",
+    "vehicle_type",
+    "vehicle_id",
+    "depot_name",
+    "lines",
+    "total_consumption_[kWh]",
+    "distance",
+    "charging_type",
+    "SOC_at_arrival",
+    "Minimum_SOC",
+    "Negative_SOC",
+)
+
 
 def open_for_csv(file_path):
     """ Create a file handle to write to.
@@ -26,7 +43,9 @@ def open_for_csv(file_path):
     :return: Function to open file
     :rtype: function
     """
-    return open(file_path, "w", newline='', encoding='utf-8')
+    # large buffer keeps the row-wise csv writers from flushing every few KiB,
+    # which matters for the multi-MB timeseries outputs
+    return open(file_path, "w", newline='', encoding='utf-8', buffering=1 << 20)
 
 
 def generate_gc_power_overview_timeseries(scenario, args):
@@ -50,14 +69,14 @@ def generate_gc_power_overview_timeseries(scenario, args):
     with open_for_csv(file_path) as f:
         csv_writer = csv.writer(f)
         csv_writer.writerow(["time"] + gc_list)
-        stations = []
         time_col = getattr(scenario, f"{gc_list[0]}_timeseries")["time"]
-        for i in range(len(time_col)):
-            time_col[i] = str(time_col[i])
-        stations.append(time_col)
-        for gc in gc_list:
-            stations.append([-x for x in getattr(scenario, f"{gc}_timeseries")["grid supply [kW]"]])
-        gc_power_overview = list(map(list, zip(*stations)))
+        # negate all grid supply columns in one vectorized pass and build the rows as an
+        # object matrix instead of transposing nested python lists element by element
+        powers = -np.array([getattr(scenario, f"{gc}_timeseries")["grid supply [kW]"]
+                            for gc in gc_list], dtype=np.float64).T
+        gc_power_overview = np.empty((len(time_col), len(gc_list) + 1), dtype=object)
+        gc_power_overview[:, 0] = [str(t) for t in time_col]
+        gc_power_overview[:, 1:] = powers
         csv_writer.writerows(gc_power_overview)
 
 
@@ -95,16 +114,19 @@ def generate_gc_overview(schedule, scenario, args):
         for gc in all_gc_list:
             if gc in used_gc_list:
                 ts = getattr(scenario, f"{gc}_timeseries")
-                max_gc_power = -min(ts["grid supply [kW]"])
-                max_nr_cs = max(ts["# CS in use [-]"])
-                sum_of_cs_energy = sum(ts["sum CS power [kW]"]) * args.interval/60
+                max_gc_power = -float(np.min(ts["grid supply [kW]"]))
+                cs_in_use = np.asarray(ts["# CS in use [-]"], dtype=np.int64)
+                max_nr_cs = int(cs_in_use.max())
+                sum_of_cs_energy = float(np.sum(ts["sum CS power [kW]"])) * args.interval/60
 
                 # use factors: to which percentage of time are the three least used CS in use
                 num_ts = scenario.n_intervals  # number of timesteps
                 # three least used CS. Less if number of CS is lower.
                 least_used_num = min(3, max_nr_cs)
-                # count number of timesteps with this exact number of occupied CS
-                count_nr_cs = [ts["# CS in use [-]"].count(max_nr_cs - i) for i in range(
+                # count number of timesteps with this exact number of occupied CS.
+                # a single bincount pass replaces one full count scan per CS
+                occupancy_counts = np.bincount(cs_in_use, minlength=max_nr_cs + 1)
+                count_nr_cs = [int(occupancy_counts[max_nr_cs - i]) for i in range(
                     least_used_num)]
                 use_factors = [sum(count_nr_cs[:i + 1]) / num_ts for i in range(
                     least_used_num)]  # relative occupancy with at least this number of occupied CS
@@ -177,18 +199,23 @@ def generate_plots(schedule, scenario, args):
     aggregate_global_results(scenario)
     # disable DEBUG logging from matplotlib
     logging.disable(logging.INFO)
-    with plt.ion():  # make plotting temporarily interactive, so plt.show does not block
+    with plt.ion(), matplotlib.rc_context(
+            # aggressively simplify line paths before drawing to cut vertex count,
+            # scoped to the overview so later figures keep their defaults
+            {'path.simplify': True, 'path.simplify_threshold': 1.0}):
+        # plt.ion makes plotting temporarily interactive, so plt.show does not block
         plt.clf()
         plot(scenario)
-        plt.gcf().set_size_inches(10, 10)
+        fig = plt.gcf()
+        fig.set_size_inches(10, 10)
         file_path_png = args.results_directory / "run_overview.png"
         if vars(args).get("scenario_name"):
             file_path_png = file_path_png.with_stem(file_path_png.stem + '_' + args.scenario_name)
-        plt.savefig(file_path_png, dpi=DPI)
+        fig.savefig(file_path_png, dpi=DPI)
         file_path_pdf = args.results_directory / "run_overview.pdf"
         if vars(args).get("scenario_name"):
             file_path_pdf = file_path_pdf.with_stem(file_path_pdf.stem + '_' + args.scenario_name)
-        plt.savefig(file_path_pdf, dpi=DPI)
+        fig.savefig(file_path_pdf, dpi=DPI)
     if args.show_plots:
         plt.show()
 
@@ -264,50 +291,62 @@ def generate(schedule, scenario, args):
 
     incomplete_rotations = []
     rotation_socs = {}
-    for id, rotation in schedule.rotations.items():
+    # convert the SOC lists to float arrays once (None becomes nan), so the
+    # per-rotation slices below are views instead of per-element list copies
+    vehicle_socs = {v_id: np.array(socs, dtype=np.float64)
+                    for v_id, socs in scenario.vehicle_socs.items()}
+    # compute the start and end indices of all rotations in one vectorized operation
+    # instead of two datetime divisions per rotation
+    if schedule.rotations:
+        departures = np.array([rot.departure_time for rot in schedule.rotations.values()],
+                              dtype='datetime64[us]')
+        arrivals = np.array([rot.arrival_time for rot in schedule.rotations.values()],
+                            dtype='datetime64[us]')
+        interval_64 = np.timedelta64(interval)
+        start_idxs = (departures - np.datetime64(sim_start_time)) // interval_64
+        end_idxs = start_idxs + (arrivals - departures) // interval_64
+    else:
+        start_idxs = end_idxs = ()
+    for (id, rotation), start_idx, end_idx in zip(
+            schedule.rotations.items(), start_idxs, end_idxs):
         # get SOC timeseries for this rotation
         vehicle_id = rotation.vehicle_id
-
-        start_idx = (rotation.departure_time - sim_start_time) // interval
-        end_idx = start_idx + ((rotation.arrival_time - rotation.departure_time) // interval)
+        start_idx = int(start_idx)
+        end_idx = int(end_idx)
         if end_idx > scenario.n_intervals:
             # SpiceEV stopped before rotation was fully simulated
             incomplete_rotations.append(id)
             continue
 
-        # get soc timeseries for current rotation
-        vehicle_soc = scenario.vehicle_socs[vehicle_id]
-
-        rotation_soc_ts = vehicle_soc[start_idx:end_idx]
+        # get soc timeseries for current rotation; rotations of one vehicle do not
+        # overlap, so the in-place trailing fill below stays within this window
+        rotation_soc_ts = vehicle_socs[vehicle_id][start_idx:end_idx]
 
         # bus does not return before simulation end
-        # replace trailing None values with last numeric value
-        for i, soc in enumerate(reversed(rotation_soc_ts)):
-            if soc is not None:
-                break
-        last_known_idx = len(rotation_soc_ts) - 1 - i
-        rotation_soc_ts[last_known_idx + 1:] = i * [rotation_soc_ts[last_known_idx]]
-
-        rotation_info = {
-            "rotation_id": id,
-            "start_time": str(rotation.departure_time),
-            "end_time": str(rotation.arrival_time),
-            "vehicle_type": rotation.vehicle_type,
-            "vehicle_id": rotation.vehicle_id,
-            "depot_name": rotation.departure_name,
-            "lines": ':'.join(rotation.lines),
-            "total_consumption_[kWh]": rotation.consumption,
-            "distance": rotation.distance,
-            "charging_type": rotation.charging_type,
-            "SOC_at_arrival": rotation_soc_ts[-1],
-            "Minimum_SOC": min(rotation_soc_ts),
-            "Negative_SOC": 1 if id in negative_rotations else 0
-        }
-        rotation_infos.append(rotation_info)
-
-        # save SOCs for each rotation
-        rotation_socs[id] = [None] * scenario.n_intervals
-        rotation_socs[id][start_idx:end_idx] = rotation_soc_ts
+        # replace trailing nan values with last numeric value
+        valid = ~np.isnan(rotation_soc_ts)
+        last_known_idx = len(rotation_soc_ts) - 1 - int(valid[::-1].argmax())
+        rotation_soc_ts[last_known_idx + 1:] = rotation_soc_ts[last_known_idx]
+
+        # row in ROTATION_SUMMARY_COLUMNS order
+        rotation_infos.append((
+            id,
+            str(rotation.departure_time),
+            str(rotation.arrival_time),
+            rotation.vehicle_type,
+            rotation.vehicle_id,
+            rotation.departure_name,
+            ':'.join(rotation.lines),
+            rotation.consumption,
+            rotation.distance,
+            rotation.charging_type,
+            float(rotation_soc_ts[-1]),
+            float(rotation_soc_ts.min()),
+            1 if id in negative_rotations else 0,
+        ))
+
+        # save SOC window for each rotation: only the covered slice and its offset
+        rotation_socs[id] = (start_idx, rotation_soc_ts)
 
     if incomplete_rotations:
         logging.warning(
@@ -324,11 +363,19 @@ def generate(schedule, scenario, args):
             rotations = sorted(rotation_socs.keys(), key=lambda k: k)
         # count active rotations for each timestep
         num_active_rotations = count_active_rotations(scenario, schedule)
+        # build the output as one dense matrix instead of assembling every row from Python
+        # lists. Intervals outside of a rotation become nan in the soc columns
+        soc_matrix = np.full((scenario.n_intervals, len(rotations)), np.nan)
+        for j, k in enumerate(rotations):
+            window_start, soc_window = rotation_socs[k]
+            soc_matrix[window_start:window_start + len(soc_window), j] = soc_window
+        rows = np.empty((scenario.n_intervals, len(rotations) + 2), dtype=object)
+        rows[:, 0] = [str(sim_start_time + i * scenario.interval)
+                      for i in range(scenario.n_intervals)]
+        rows[:, 1:-1] = soc_matrix
+        rows[:, -1] = num_active_rotations
         data = [["time"] + rotations + ['# active rotations']]
-        for i in range(scenario.n_intervals):
-            t = sim_start_time + i * scenario.interval
-            socs = [str(rotation_socs[k][i]) for k in rotations]
-            data.append([str(t)] + socs + [num_active_rotations[i]])
+        data.extend(rows)
 
         file_path = args.results_directory / "rotation_socs.csv"
         if vars(args).get("scenario_name"):
@@ -339,8 +386,8 @@ def generate(schedule, scenario, args):
         if vars(args).get("scenario_name"):
             file_path = file_path.with_stem(file_path.stem + '_' + args.scenario_name)
         with open_for_csv(file_path) as f:
-            csv_writer = csv.DictWriter(f, list(rotation_infos[0].keys()))
-            csv_writer.writeheader()
+            csv_writer = csv.writer(f)
+            csv_writer.writerow(ROTATION_SUMMARY_COLUMNS)
             csv_writer.writerows(rotation_infos)
 
     if vars(args).get('create_trips_in_report', False):
@@ -385,8 +432,7 @@ def write_csv(data: Iterable, file_path, propagate_errors=False):
     try:
         with open_for_csv(file_path) as f:
             csv_writer = csv.writer(f)
-            for row in data:
-                csv_writer.writerow(row)
+            csv_writer.writerows(data)
     except Exception as e:
         logging.warning(f"Writing to {file_path} failed due to {str(e)}")
         if propagate_errors:
@@ -431,13 +477,18 @@ def prepare_histogram(rotations, schedule):
 
     # suitable step size found
     labels = [f"{min_bin + i*step} - {min_bin + (i+1)*step}" for i in range(num_bins)]
-    # init bins: track bins for each vehicle type individually
-    bins = {v_types: [0]*num_bins for v_types in schedule.vehicle_types}
 
-    # fill bins with rotations
-    for rot, value in rotations.items():
-        position = int((value - min_bin) // step)
-        bins[schedule.rotations[rot].vehicle_type][position] += 1
+    # fill bins with rotations: one C-level histogram pass per vehicle type instead of
+    # binning every rotation in Python. The bin edges reproduce the floor division
+    # (value - min_bin) // step used before
+    values = np.fromiter(rotations.values(), dtype=np.float64, count=len(rotations))
+    v_types = np.array([schedule.rotations[rot].vehicle_type for rot in rotations])
+    edges = min_bin + step * np.arange(num_bins + 1)
+    # fractional values can lie just above the last edge, since the edges are derived from the
+    # integer-truncated maximum. Clip them into the last bin instead of losing them
+    values = np.minimum(values, edges[-1])
+    bins = {v_type: np.histogram(values[v_types == v_type], bins=edges)[0]
+            for v_type in schedule.vehicle_types}
 
     return bins, labels
 
@@ -455,11 +506,10 @@ def plot_distance_per_rotation_distribution(extended_plots_path, schedule):
 
     # plot
     fig, ax = plt.subplots()
-    bar_bottom = [0] * len(labels)
+    bar_bottom = np.zeros(len(labels))
     for v_type in schedule.vehicle_types:
         ax.bar(labels, bins[v_type], width=0.9, label=v_type, bottom=bar_bottom)
-        for i in range(len(labels)):
-            bar_bottom[i] += bins[v_type][i]
+        bar_bottom = bar_bottom + bins[v_type]
     ax.set_xlabel('Distance [km]')
     plt.xticks(rotation=30)  # slant labels for better readability
     ax.set_ylabel('Number of rotations')
@@ -485,11 +535,10 @@ def plot_consumption_per_rotation_distribution(extended_plots_path, schedule):
 
     # plot
     fig, ax = plt.subplots()
-    bar_bottom = [0] * len(labels)
+    bar_bottom = np.zeros(len(labels))
     for v_type in schedule.vehicle_types:
         ax.bar(labels, bins[v_type], width=0.9, label=v_type, bottom=bar_bottom)
-        for i in range(len(labels)):
-            bar_bottom[i] += bins[v_type][i]
+        bar_bottom = bar_bottom + bins[v_type]
     ax.set_xlabel('Energy consumption [kWh]')
     plt.xticks(rotation=30)
     ax.set_ylabel('Number of rotations')
@@ -514,15 +563,16 @@ def plot_charge_type_distribution(extended_plots_path, scenario, schedule):
     """
     # count charging types (also with regard to negative rotations)
     charging_types = {'oppb': 0, 'oppb_neg': 0, 'depb': 0, 'depb_neg': 0}
-    negative_rotations = schedule.get_negative_rotations(scenario)
-    for rot in schedule.rotations:
-        ct = schedule.rotations[rot].charging_type
-        if rot in negative_rotations:
+    # set membership is constant time, while get_negative_rotations returns a list
+    negative_rotations = set(schedule.get_negative_rotations(scenario))
+    for rot_id, rot in schedule.rotations.items():
+        ct = rot.charging_type
+        if rot_id in negative_rotations:
             ct += '_neg'
-        try:
+        if ct in charging_types:
             charging_types[ct] += 1
-        except KeyError:
-            logging.error(f"Rotation {rot}: unknown charging type: '{ct}'")
+        else:
+            logging.error(f"Rotation {rot_id}: unknown charging type: '{ct}'")
 
     # plot
     fig, ax = plt.subplots()
@@ -557,6 +607,32 @@ def plot_charge_type_distribution(extended_plots_path, scenario, schedule):
     plt.close()
 
 
+def downsample_indices(values, n_out=2000):
+    """ Select indices for plotting that preserve the extrema of a long timeseries.
+
+    Splits *values* into buckets and keeps the minimum and maximum of each bucket,
+    so peaks and valleys survive while the number of drawn vertices stays capped.
+
+    :param values: timeseries values
+    :type values: list or numpy.ndarray
+    :param n_out: approximate number of indices to keep
+    :type n_out: int
+    :return: sorted indices into values
+    :rtype: numpy.ndarray
+    """
+    num_values = len(values)
+    if num_values <= n_out:
+        return np.arange(num_values)
+    values = np.array(values, dtype=np.float64)
+    bucket_edges = np.linspace(0, num_values, n_out // 2 + 1, dtype=np.int64)
+    indices = {0, num_values - 1}
+    for start, end in zip(bucket_edges[:-1], bucket_edges[1:]):
+        bucket = values[start:end]
+        indices.add(int(start) + int(np.argmin(bucket)))
+        indices.add(int(start) + int(np.argmax(bucket)))
+    return np.array(sorted(indices))
+
+
 def plot_gc_power_timeseries(extended_plots_path, scenario):
     """Plots the different loads (total, feedin, external) of all grid connectors.
 
@@ -602,14 +678,18 @@ def plot_gc_power_timeseries(extended_plots_path, scenario):
                 ax2.set_ylabel("stored battery energy [kWh]")
                 # get next color from color cycle (just plotting would start with first color)
                 next_color = plt.rcParams['axes.prop_cycle'].by_key()["color"][header_index]
+                keep = downsample_indices(header_values)
                 ax2.plot(
-                    time_values, header_values,
+                    [time_values[i] for i in keep], [header_values[i] for i in keep],
                     label=header, c=next_color, linestyle="dashdot")
                 ax2.legend()
                 fig.set_size_inches(8, 4.8)
             else:
                 # normal (non-battery) plot
-                ax.plot(time_values, header_values, label=header)
+                keep = downsample_indices(header_values)
+                ax.plot(
+                    [time_values[i] for i in keep], [header_values[i] for i in keep],
+                    label=header)
 
         if has_battery_column:
             # align y axis so that 0 is shared
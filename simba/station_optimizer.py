@@ -45,6 +45,23 @@ class StationOptimizer:
         if config.reduce_rotations:
             self.schedule.rotations = {rot: sched.rotations[rot] for rot in config.rotations}
 
+        self.precompute_trip_indices()
+
+    def precompute_trip_indices(self):
+        """ Store the timeseries indices of departure and arrival on every trip.
+
+        The indices only depend on the scenario start time and interval, so the datetime
+        arithmetic is done once instead of in every hot loop. Must be called again whenever
+        the scenario is regenerated, e.g. by run_schedule, since filtering rotations can
+        shift the scenario start time.
+        """
+        start_time = self.scenario.start_time
+        interval = self.scenario.interval
+        for rot in self.schedule.rotations.values():
+            for trip in rot.trips:
+                trip.departure_idx = (trip.departure_time - start_time) // interval
+                trip.arrival_idx = (trip.arrival_time - start_time) // interval
+
     def loop(self, **kwargs):
         """ Loops recursively over every base group and handles deep or greedy arguments.
 
@@ -59,7 +76,7 @@ class StationOptimizer:
         opt_type = kwargs.get("opt_type", self.config.opt_type)
         electrified_station = self.must_include_set.union(self.electrified_station_set)
         self.scenario.vehicle_socs = self.timeseries_calc(electrified_station)
-        self.base_scenario = deepcopy(self.scenario)
+        self.base_scenario = opt_util.fast_deepcopy(self.scenario)
         self.base_schedule = copy(self.schedule)
 
         self.base_stations = self.electrified_stations.copy()
@@ -100,7 +117,7 @@ class StationOptimizer:
             events, stations = group
             # define the current tree from the decision trees
             self.current_tree = self.decision_trees[group_nr]
-            lines = {lne for e in events for lne in e.rotation.lines}
+            lines = set().union(*(e.rotation.lines for e in events))
             self.logger.warning(
                 "Optimizing %s out of %s groups. This includes these Lines: %s",
                 group_nr + 1, len(groups), lines)
@@ -116,7 +133,7 @@ class StationOptimizer:
             if self.config.solver == "spiceev":
                 # running SpiceEV changes the scenario and vehicle ids. Since the low SoC events
                 # point to the base vehicle ids, these have to be used in the group optimization
-                self.scenario = deepcopy(self.base_scenario)
+                self.scenario = opt_util.fast_deepcopy(self.base_scenario)
 
             # first run is always step by step
             self.group_optimization(
@@ -167,7 +184,8 @@ class StationOptimizer:
                 self.scenario = copy(self.base_scenario)
                 self.schedule = copy(self.base_schedule)
 
-                self.scenario.vehicle_socs = deepcopy(self.base_scenario.vehicle_socs)
+                self.scenario.vehicle_socs = opt_util.copy_vehicle_socs(
+                    self.base_scenario.vehicle_socs)
                 # deep copy of schedule.rotations is very slow. Not needed for quick calculation.
                 if self.config.solver == "spiceev":
                     self.schedule.rotations = deepcopy(self.base_schedule.rotations)
@@ -291,17 +309,17 @@ class StationOptimizer:
 
         kwargs["lifted_socs"] = kwargs.get("lifted_socs", self.scenario.vehicle_socs)
 
+        missing_energy = opt_util.get_missing_energy(event_group, min_soc=self.config.min_soc)
+        if missing_energy >= 0:
+            self.logger.debug("Already electrified: Returning")
+            return self.electrified_stations
+
         # evaluate with current scenario and schedule and lifted values from the
         # call above. Important not to use the scenario in optimizer, since it gets overwritten
         # every call and only relevant trips are adjusted. This leads to problems
         # when the recursive call goes on a higher level eg. level 0 - level 1 - level 2 - level 1
         station_eval = opt_util.evaluate(event_group, self, soc_data=kwargs["lifted_socs"])
 
-        missing_energy = opt_util.get_missing_energy(event_group, min_soc=self.config.min_soc)
-        if missing_energy >= 0:
-            self.logger.debug("Already electrified: Returning")
-            return self.electrified_stations
-
         # get rotations from event dict and calculate the missing energy
         rotation_dict = {e.rotation.id: e.rotation for e in event_group}
 
@@ -347,18 +365,23 @@ class StationOptimizer:
             # place before in the optimization but later in the time series in regards to the
             # current electrification would show to much charge, since charging curves decrease over
             # SoC.
-            self.deepcopy_socs()
+            # calculate from the base SoCs directly. This fuses the reset of the scenario SoCs
+            # with the copy inside of timeseries_calc, i.e. a single copy instead of two
             electrified_stations = self.electrified_station_set.union(best_station_ids)
-            self.scenario.vehicle_socs = self.timeseries_calc(electrified_stations, event_rotations)
+            self.scenario.vehicle_socs = self.timeseries_calc(
+                electrified_stations, event_rotations, soc_data=self.base_scenario.vehicle_socs)
         else:
             self.schedule.rotations = rotation_dict
             self.schedule, self.scenario = opt_util.run_schedule(
                 self.schedule, self.args,  electrified_stations=self.electrified_stations)
+            # keep the cached trip indices in sync with the regenerated scenario
+            self.precompute_trip_indices()
 
         kwargs["lifted_socs"] = self.scenario.vehicle_socs.copy()
 
-        self.not_possible_stations = set(self.electrified_stations.keys()).union(
-            self.not_possible_stations)
+        # electrified stations can not be electrified again. Grow the set in place instead of
+        # rebuilding it from all electrified stations on every recursion
+        self.not_possible_stations.update(self.electrified_stations.keys())
         event_rotations_ids = {event.rotation.id for event in event_group}
         new_events = self.get_low_soc_events(rotations=event_rotations_ids,
                                              rel_soc=True, **kwargs)
@@ -410,10 +433,10 @@ class StationOptimizer:
             thresh = self.config.pruning_threshold
             if len(pre_optimized_set) - len(self.electrified_station_set) < thresh:
                 self.copy_scen_sched()
-                self.deepcopy_socs()
                 electrified_stations = self.electrified_station_set.union(best_station_ids)
                 self.scenario.vehicle_socs = self.timeseries_calc(
-                    electrified_stations, event_rotations)
+                    electrified_stations, event_rotations,
+                    soc_data=self.base_scenario.vehicle_socs)
                 prune_events = self.get_low_soc_events(
                     rotations=event_rotations_ids, rel_soc=True, **kwargs)
                 station_eval = opt_util.evaluate(prune_events, self)
@@ -428,11 +451,6 @@ class StationOptimizer:
 
         return self.electrified_stations
 
-    @opt_util.time_it
-    def deepcopy_socs(self):
-        """ Deepcopy of the SoCs in the scenario."""
-        self.scenario.vehicle_socs = deepcopy(self.base_scenario.vehicle_socs)
-
     @opt_util.time_it
     def copy_scen_sched(self):
         """Copy of the base scenario and base schedule."""
@@ -450,7 +468,7 @@ class StationOptimizer:
         return sorted(charge_events_single_station, key=lambda x: x.arrival_time)
 
     @opt_util.time_it
-    def timeseries_calc(self, electrified_stations: set, rotations=None) -> dict:
+    def timeseries_calc(self, electrified_stations: set, rotations=None, soc_data=None) -> dict:
         """ A quick estimation of SoCs.
 
         Iterates through rotations and calculates the SoC.
@@ -466,26 +484,43 @@ class StationOptimizer:
         :type rotations: iterable[Rotation]
         :param electrified_stations: Stations which are electrified. Default None leads to using the
             so far optimized optimizer.electrified_station_set
+        :param soc_data: SoC data the lifts are applied on. Default None means the SoC data of the
+            optimizer scenario is used. The data is copied, not mutated.
+        :type soc_data: dict
         :return: Returns SoC dict with lifted SoCs
         :rtype dict()
         """
         if rotations is None:
             rotations = self.schedule.rotations.values()
 
-        vehicle_socs = deepcopy(self.scenario.vehicle_socs)
+        if soc_data is None:
+            soc_data = self.scenario.vehicle_socs
+        # shallow copy of the outer dict. The SoC series of a vehicle is only copied once the
+        # first of its rotations is calculated, so vehicles outside of the given rotations
+        # keep sharing their unmodified series with the input data
+        vehicle_socs = dict(soc_data)
+        copied_vehicles = set()
+        # hoist per-call invariants out of the trip loop. The loop body runs once per trip,
+        # so repeated attribute lookups and helper calls add up
+        desired_soc_deps = self.args.desired_soc_deps
+        desired_soc_opps = self.args.desired_soc_opps
         for rot in rotations:
-            ch_type = (rot.vehicle_id.find("oppb") > 0) * "oppb" + (
-                    rot.vehicle_id.find("depb") > 0) * "depb"
-            v_type = rot.vehicle_id.split("_" + ch_type)[0]
+            # the rotation knows its vehicle and charging type, no need to parse the vehicle id
+            ch_type = rot.charging_type
+            v_type = rot.vehicle_type
             capacity = self.schedule.vehicle_types[v_type][ch_type]["capacity"]
             soc_over_time_curve = self.soc_charge_curve_dict[v_type][ch_type]
+            if rot.vehicle_id not in copied_vehicles:
+                vehicle_socs[rot.vehicle_id] = np.array(
+                    vehicle_socs[rot.vehicle_id], dtype=np.float32)
+                copied_vehicles.add(rot.vehicle_id)
             soc = vehicle_socs[rot.vehicle_id]
-            last_soc = self.args.desired_soc_deps
+            last_soc = desired_soc_deps
             for i, trip in enumerate(rot.trips):
                 # Handle consumption during trip
                 # Find start, end and delta_soc of the current trip
-                idx_start = opt_util.get_index_by_time(self.scenario, trip.departure_time)
-                idx_end = opt_util.get_index_by_time(self.scenario, trip.arrival_time)
+                idx_start = trip.departure_idx
+                idx_end = trip.arrival_idx
                 delta_idx = idx_end + 1 - idx_start
                 d_soc = trip.consumption / capacity
 
@@ -496,10 +531,9 @@ class StationOptimizer:
                 last_soc = last_soc - d_soc
 
                 # Fill the values while the vehicle is standing waiting for the next trip
-                idx = opt_util.get_index_by_time(self.scenario, trip.arrival_time)
+                idx = idx_end
                 try:
-                    idx_end = opt_util.get_index_by_time(
-                        self.scenario, rot.trips[i + 1].departure_time)
+                    idx_end = rot.trips[i + 1].departure_idx
                 except IndexError:
                     # No next trip. Rotation finished.
                     break
@@ -527,7 +561,7 @@ class StationOptimizer:
 
                 # Clip the SoC lift to the desired_soc_deps,
                 # which is the maximum that can reached when the rotation stays positive
-                d_soc = min(d_soc, self.args.desired_soc_opps)
+                d_soc = min(d_soc, desired_soc_opps)
 
                 # Add the charge as linear interpolation during the charge time, but only start
                 # after the buffer time
@@ -539,9 +573,6 @@ class StationOptimizer:
                 # Keep track of the last SoC as starting point for the next trip
                 last_soc = soc[idx + buffer_idx + delta_idx-1]
 
-            start_idx = opt_util.get_index_by_time(self.scenario, rot.trips[0].departure_time)
-            end_idx = opt_util.get_index_by_time(self.scenario, rot.trips[-1].arrival_time)
-            vehicle_socs[rot.vehicle_id][start_idx:end_idx+1] = soc[start_idx:end_idx+1]
         return vehicle_socs
 
     @opt_util.time_it
@@ -648,19 +679,40 @@ class StationOptimizer:
         """
 
         station_ids = [x[0] for x in station_eval]
+        amount = len(pre_optimized_set) - 1
         try:
-            generator = gens[str(station_ids) + str(len(pre_optimized_set) - 1)]
+            generator = gens[str(station_ids) + str(amount)]
         except KeyError:
-            generator = opt_util.combination_generator(station_ids, len(pre_optimized_set) - 1)
-            gens[str(station_ids) + str(len(pre_optimized_set) - 1)] = generator
+            generator = opt_util.combination_generator(station_ids, amount)
+            gens[str(station_ids) + str(amount)] = generator
         station_eval_dict = {stat[0]: stat[1] for stat in station_eval}
+
+        # Branch-and-bound upper bound: station_eval is sorted by potential, so the best
+        # combination beginning at index i is the sum of the next 'amount' potentials.
+        # Combinations are generated in this index order, therefore once the bound at the index
+        # of the first station drops below the threshold, no later combination can pass it.
+        potentials = [x[1] for x in station_eval]
+        if 0 < amount <= len(potentials):
+            cumulated = np.cumsum(potentials)
+            window_sums = cumulated[amount - 1:] - np.concatenate(([0], cumulated[:-amount]))
+        else:
+            window_sums = np.zeros(0)
+        index_by_id = {station_id: i for i, station_id in enumerate(station_ids)}
+        threshold = -missing_energy * self.config.estimation_threshold
+
         for comb in generator:
+            first_index = index_by_id[comb[0]] if comb else 0
+            if first_index < len(window_sums) and window_sums[first_index] <= threshold:
+                self.logger.debug(
+                    "Pruned remaining combinations, since their upper potential bound of %s "
+                    "is too low", window_sums[first_index])
+                raise opt_util.AllCombinationsCheckedException
             node_name = opt_util.stations_hash(comb)
             if node_name not in self.current_tree:
                 # only check the combination of stations if they have the remote chance of
                 # fulfilling the missing energy. The default for the estimation_threshold is 80%
                 potential = sum([station_eval_dict[stat] for stat in comb])
-                if potential > -missing_energy * self.config.estimation_threshold:
+                if potential > threshold:
                     self.current_tree[node_name] = get_init_node()
                     return comb, False
                 else:
@@ -707,28 +759,22 @@ class StationOptimizer:
                 raise opt_util.SuboptimalSimulationException
 
         min_nr_visited = float('inf')
-        # find the lowest amount of visits in the possible stations /  children
-        # not viable stations are skipped
+        # find the lowest amount of visits in the possible stations / children.
+        # not viable stations are skipped. The nodes are resolved once and kept for the
+        # choice below instead of hashing every station combination a second time
+        viable_children = []
         for station, _ in station_eval:
             # create a station combination from already electrified
             # stations and possible new stations
             stats = self.electrified_station_set.union([station])
-            node_name = opt_util.stations_hash(stats)
-            if not self.current_tree[node_name]["viable"]:
+            node = self.current_tree[opt_util.stations_hash(stats)]
+            if not node["viable"]:
                 continue
-            min_nr_visited = min(min_nr_visited, self.current_tree[node_name]["visit_counter"])
+            viable_children.append((station, node))
+            min_nr_visited = min(min_nr_visited, node["visit_counter"])
         # simply visit the least visited node, starting from the one with the highest potential
-        # not viable stations are skipped
-        for stat_eval in station_eval:
-            station, _ = stat_eval
-            # create a station combination from already electrified stations
-            # and possible new station
-            stats = self.electrified_station_set.union([station])
-            node_name = opt_util.stations_hash(stats)
-            if not self.current_tree[node_name]["viable"]:
-                continue
-
-            if self.current_tree[opt_util.stations_hash(stats)]["visit_counter"] == min_nr_visited:
+        for station, node in viable_children:
+            if node["visit_counter"] == min_nr_visited:
                 best_station_id = station
                 return [best_station_id], True
 
@@ -832,6 +878,9 @@ class StationOptimizer:
             self.schedule, self.args, electrified_stations)
         self.schedule = new_sched
         self.scenario = new_scen
+        # the regenerated scenario can have a shifted start time, e.g. if the earliest
+        # rotation was filtered out, so the cached trip indices have to be re-stamped
+        self.precompute_trip_indices()
         self.must_include_set = must_include_set
         return must_include_set, electrified_stations
 
@@ -919,13 +968,17 @@ class StationOptimizer:
         # which was not None, eg, [1,5,4,None,None] becomes [1,5,4,4,4]
         for v_id, soc in self.scenario.vehicle_socs.items():
             soc = np.array(soc)
-            if soc[-1] is None:
-                for i in range(len(soc) - 1, -1, -1):
-                    if soc[i] is not None:
-                        # value is the last value which is not None. Overwrite the None values until
-                        # the end of the list with this value
-                        soc[i+1:] = soc[i]
-                        break
+            if soc.dtype == object:
+                # at least one None value exists. Find the last value which is not None and
+                # overwrite the None values until the end of the list with this value
+                mask = np.not_equal(soc, None)
+                if mask.any():
+                    last_not_none = np.nonzero(mask)[0][-1]
+                    soc[last_not_none + 1:] = soc[last_not_none]
+            # cast to single precision for faster math and smaller copies at later stages.
+            # Remaining None values, which can only occur before the last valid
+            # value, are mapped to nan.
+            soc = soc.astype(np.float32)
             self.scenario.vehicle_socs[v_id] = soc
 
     def get_rotation_soc(self, rot_id, soc_data: dict = None):
@@ -968,12 +1021,8 @@ class StationOptimizer:
         start_time_event = self.get_time_by_index(start_idx)
         end_time_event = self.get_time_by_index(end_idx)
 
-        trips = []
-        for i, trip in enumerate(rot.trips):
-            if end_time_event >= trip.arrival_time > start_time_event:
-                trips.append(trip)
-
-        return trips
+        return [trip for trip in rot.trips
+                if end_time_event >= trip.arrival_time > start_time_event]
 
     @opt_util.time_it
     def get_time_by_index(self, idx):
@@ -1031,7 +1080,6 @@ class StationOptimizer:
             rot = self.schedule.rotations[rot_id]
             soc, rot_start_idx, rot_end_idx = self.get_rotation_soc(rot_id, soc_data)
             rot_end_idx += 1
-            idx = range(0, len(soc))
 
             # if rotation gets a start SoC below the args.desired_soc_deps, this should change
             # below 0 SoC events, since fixing the rotation before leads to fixing this rotation.
@@ -1042,16 +1090,16 @@ class StationOptimizer:
                 if soc[rot_start_idx] < self.args.desired_soc_deps:
                     soc = self.lift_and_clip_positive_gradient(rot_start_idx, soc, soc_upper_thresh)
 
-            # combined data of the SoC data of the rotation and the original index
-            # the array will get masked later, so the index of the array might be different
-            # to the index data column
-            soc_idx = np.array((soc, idx))[:, rot_start_idx:rot_end_idx]
+            # the rotation slice of the SoC data. The slice is masked later, so its indices are
+            # shifted by rot_start_idx compared to the original data
+            soc = np.asarray(soc)
+            soc_slice = soc[rot_start_idx:rot_end_idx]
 
-            # Mask for soc_idx which is used to know if an index has been checked or not
-            mask = np.ones(len(soc_idx[0])).astype(bool)
+            # Mask for soc_slice which is used to know if an index has been checked or not
+            mask = np.ones(len(soc_slice), dtype=bool)
 
             # get the minimum SoC and index of this value. The mask does nothing yet
-            min_soc, min_idx = get_min_soc_and_index(soc_idx, mask)
+            min_soc, min_idx = get_min_soc_and_index(soc_slice, mask, rot_start_idx)
 
             # Used to check if an infinite loop is happening
             old_idx = -1
@@ -1061,32 +1109,19 @@ class StationOptimizer:
             # removed. At some point the reduced time series is either empty or does not have a
             # SoC below the lower threshold.
             while min_soc < soc_lower_thresh:
-                # soc_idx is of type float, so the index needs to be cast to int
-                min_idx = int(min_idx)
-
                 if min_idx == old_idx:
                     raise opt_util.InfiniteLoopException
                 else:
                     old_idx = min_idx
-                i = min_idx
 
                 # find the first index by going back from the minimal SoC index, where the SoC
                 # was above the upper threshold OR the index where the rotation started.
-                while soc[i] < soc_upper_thresh:
-                    if i <= rot_start_idx:
-                        break
-                    i -= 1
-
-                # which index in the original data is the found index?
-                start = i
+                above = np.nonzero(soc[rot_start_idx:min_idx + 1] >= soc_upper_thresh)[0]
+                start = rot_start_idx + int(above[-1]) if above.size else rot_start_idx
 
-                i = min_idx
                 # do the same as before but find the index after the minimal SoC.
-                while soc[i] < soc_upper_thresh:
-                    if i >= rot_end_idx - 1:
-                        break
-                    i += 1
-                end = i
+                above = np.nonzero(soc[min_idx:rot_end_idx] >= soc_upper_thresh)[0]
+                end = min_idx + int(above[0]) if above.size else rot_end_idx - 1
 
                 # with the start index and the minimal index find trips, in this time span
                 trips = self.get_trips(rot=rot, start_idx=start, end_idx=min_idx)
@@ -1113,8 +1148,8 @@ class StationOptimizer:
                 # the stations which have potential should be filtered by the not_possible_stations,
                 # which are stations which for some reason should not be electrified.
                 possible_stations = possible_stations.difference(self.not_possible_stations)
-                ch_type = "depb" if "depb" in rot.vehicle_id else "oppb"
-                v_type = rot.vehicle_id.split("_" + ch_type)[0]
+                ch_type = rot.charging_type
+                v_type = rot.vehicle_type
 
                 # with the gathered data create the event object
                 event = opt_util.LowSocEvent(
@@ -1138,7 +1173,7 @@ class StationOptimizer:
                 if not np.any(mask):
                     break
                 # Check the remaining unmasked SoCs for the minimal SoC
-                min_soc, min_idx = get_min_soc_and_index(soc_idx, mask)
+                min_soc, min_idx = get_min_soc_and_index(soc_slice, mask, rot_start_idx)
 
         return events
 
@@ -1164,51 +1199,34 @@ class StationOptimizer:
         """
 
         delta = self.args.desired_soc_deps - soc[start_idx]
-        # lift all beyond the start index (including the start_idx)
-        soc[start_idx:] += delta
+        # only the part beyond the start index (including the start_idx) is lifted.
         # values before the start index stay unaffected
-        soc_pre = soc[:start_idx]
-
-        # to speed up computation, only look at the affected part
-        soc = soc[start_idx:]
-        soc_max = np.max(soc)
+        lifted = soc[start_idx:] + delta
         # Clip SoC values to soc_upper_thresh.
-        # Multiple local maxima above this value can exist which,
-        # if they are rising over time, need multiple clippings.
-        while soc_max > soc_upper_thresh:
-            # descending array from len(soc) to 0
-            desc = np.arange(len(soc), 0, -1)
-            # gradient of SoC i.e. positive if charging, negative if discharging
-            diff = np.hstack((np.diff(soc), -1))
-            # masking of SoCs >1 and negative gradient for local maximum
-            # i.e. after lifting the SoC, it finds the first spot where the SoC is bigger
-            # than the upper threshold and descending.
-            idc_loc_max = np.argmax(desc * (soc > 1) * (diff < 0))
-
-            # find the SoC value of this local maximum
-            soc_max = soc[idc_loc_max]
-            # reducing everything after local maximum
-            soc[idc_loc_max:] = soc[idc_loc_max:] - (soc_max - soc_upper_thresh)
-
-            # clip everything before local maximum
-            soc[:idc_loc_max][soc[:idc_loc_max] > 1] = soc_upper_thresh
-            soc_max = np.max(soc)
-        # restore SoC with unaffected part
-        soc = np.hstack((soc_pre, soc))
+        # Every value is reduced by the overshoot of the highest SoC seen so far, i.e. local
+        # maxima above the threshold are flattened to it and all later values drop by the
+        # cumulative overshoot. This single pass is equivalent to repeatedly finding the first
+        # local maximum above the threshold and subtracting its excess from the tail.
+        soc[start_idx:] = lifted - np.maximum(0, np.maximum.accumulate(lifted) - soc_upper_thresh)
         return soc
 
 
-def get_min_soc_and_index(soc_idx, mask):
-    """ Returns the minimal SoC and the corresponding index of a masked soc_idx.
+def get_min_soc_and_index(soc_slice, mask, offset):
+    """ Returns the minimal SoC and the corresponding index of a masked SoC slice.
 
-    :param soc_idx: SoC values and their corresponding index of shape (2,nr_values).
-    :type soc_idx: np.array
-    :param mask: boolean mask. It is false where the soc_idx has been checked already
+    :param soc_slice: SoC values of a single rotation
+    :type soc_slice: np.array
+    :param mask: boolean mask. It is false where the soc_slice has been checked already
     :type mask: np.array
-    :return: minimal SoC and corresponding index
-    :rtype: tuple(Float, Float)
+    :param offset: index of the first slice value in the original SoC data
+    :type offset: int
+    :return: minimal SoC and corresponding index in the original SoC data
+    :rtype: tuple(float, int)
     """
-    return soc_idx[:, mask][:, np.argmin(soc_idx[0, mask])]
+    # masked out values are replaced with inf instead of building a reduced copy of the data
+    masked_soc = np.where(mask, soc_slice, np.inf)
+    pos = int(np.argmin(masked_soc))
+    return masked_soc[pos], offset + pos
 
 
 def get_init_node():
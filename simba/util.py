@@ -3,6 +3,7 @@ import csv
 import json
 import logging
 from pathlib import Path
+import re
 import shutil
 import subprocess
 from functools import lru_cache
@@ -65,16 +66,9 @@ def uncomment_json_file(f, char='//'):
     :return: JSON file content
     :rtype: dict
     """
-    uncommented_data = ""
-    for line in f:
-        comment_idx = line.find(char)
-        if comment_idx == -1:
-            # no comment in line
-            uncommented_data += line
-        else:
-            # remove comment from line
-            uncommented_data += line[:comment_idx]
-    return json.loads(uncommented_data)
+    # strip everything from the comment sequence to the end of its line
+    # in a single regex pass instead of looping over lines in Python
+    return json.loads(re.sub(re.escape(char) + r'[^\n]*', '', f.read()))
 
 
 def get_mean_from_hourly_dict(hourly_dict: dict, start: datetime, end: datetime) -> float:
@@ -305,6 +299,37 @@ def setup_logging(args, time_str):
     logging.captureWarnings(True)
 
 
+# sentinel for hours not covered by any time range of a buffer time dict
+_NO_BUFFER = object()
+
+
+@lru_cache(maxsize=None)
+def _compile_buffer_table(time_ranges):
+    """ Compile buffer time ranges into a per-hour lookup table.
+
+    :param time_ranges: sorted (time_range, buffer) pairs of a buffer time dict
+    :type time_ranges: tuple
+    :return: buffer time for each hour of the day, _NO_BUFFER where no range matches
+    :rtype: tuple
+    """
+    table = [_NO_BUFFER] * 24
+    for time_range, buffer in time_ranges:
+        if time_range == 'else':
+            hours = range(24)
+        else:
+            start_hour, end_hour = [int(t) for t in time_range.split('-')]
+            if end_hour < start_hour:
+                # wrap-around time range, e.g. "22-6"
+                hours = [*range(start_hour, 24), *range(end_hour)]
+            else:
+                hours = range(start_hour, end_hour)
+        for hour in hours:
+            # earlier (sorted) time ranges take precedence
+            if table[hour] is _NO_BUFFER:
+                table[hour] = buffer
+    return tuple(table)
+
+
 def get_buffer_time(trip, default=0):
     """ Get buffer time at arrival station of a trip.
 
@@ -331,23 +356,11 @@ def get_buffer_time(trip, default=0):
     # distinct buffer times depending on time of day can be provided
     # in that case buffer time is of type dict instead of int
     if isinstance(buffer_time, dict):
-        # sort dict to make sure 'else' key is last key
-        buffer_time = {key: buffer_time[key] for key in sorted(buffer_time)}
-        current_hour = trip.arrival_time.hour
-        for time_range, buffer in buffer_time.items():
-            if time_range == 'else':
-                buffer_time = buffer
-                break
-            else:
-                start_hour, end_hour = [int(t) for t in time_range.split('-')]
-                if end_hour < start_hour:
-                    if current_hour >= start_hour or current_hour < end_hour:
-                        buffer_time = buffer
-                        break
-                else:
-                    if start_hour <= current_hour < end_hour:
-                        buffer_time = buffer
-                        break
+        # sort items to make sure 'else' key is last and equal dicts share a cache entry
+        table = _compile_buffer_table(tuple(sorted(buffer_time.items())))
+        buffer = table[trip.arrival_time.hour]
+        if buffer is not _NO_BUFFER:
+            buffer_time = buffer
     return buffer_time
 
 